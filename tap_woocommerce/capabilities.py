@@ -0,0 +1,191 @@
+"""Store capability probe shared by all WooCommerce streams."""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "tap-woocommerce-capabilities.json")
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+ROUTE_PARAMETER = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+
+
+class StoreCapabilities:
+    """What the REST API of one WooCommerce store supports.
+
+    Capabilities come from the `wc/v3` namespace index, which lists every route
+    with the query arguments it accepts. Unlike `system_status` it runs no
+    database or environment checks. If the index is unavailable, the
+    WooCommerce version from `system_status` is used instead.
+
+    Probes are shared by every stream of the process and persisted to a local
+    cache file, so repeated runs against the same `site_url` skip them until
+    `capability_cache_ttl` seconds have passed.
+    """
+
+    _lock = threading.Lock()
+    _loaded: Dict[str, "StoreCapabilities"] = {}
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, dict]],
+        version: Optional[str] = None,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        self.routes = routes
+        self.version = version
+        self.fetched_at = fetched_at or time.time()
+
+    @classmethod
+    def for_stream(cls, stream: Any) -> "StoreCapabilities":
+        """Return the capabilities of the stream's store, probing it if needed."""
+        config = stream.config
+        site_url = config["site_url"]
+        ttl = config.get("capability_cache_ttl", DEFAULT_CACHE_TTL)
+        with cls._lock:
+            capabilities = cls._loaded.get(site_url)
+            if capabilities is None or (ttl and capabilities.expired(ttl)):
+                capabilities = cls._read_cache(config, ttl)
+                if capabilities is None:
+                    capabilities = cls._probe(stream)
+                    if capabilities.routes is not None or capabilities.version:
+                        cls._write_cache(config, capabilities)
+                cls._loaded[site_url] = capabilities
+            return capabilities
+
+    def expired(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at > ttl
+
+    @staticmethod
+    def route_key(path: str) -> str:
+        """Return the index key of a stream path such as `orders/{order_id}/notes`."""
+        return f"/wc/v3/{path}"
+
+    def has_route(self, path: str) -> Optional[bool]:
+        """Return whether the route exists, or None if the index is unknown."""
+        if self.routes is None:
+            return None
+        return self.route_key(path) in self.routes
+
+    def orderby_values(self, path: str) -> List[str]:
+        """Return the accepted `orderby` values of a collection."""
+        route = (self.routes or {}).get(self.route_key(path)) or {}
+        return route.get("orderby", [])
+
+    def supports_modified_after(self, path: str) -> bool:
+        """Return True if the collection can be filtered on its modified date.
+
+        A collection that takes date filters decides for itself. Collections
+        that take neither `after` nor `modified_after`, such as `customers`,
+        follow the store as a whole, as they did when the tap only checked
+        the WooCommerce version. Otherwise an old-store lookback, which they
+        ignore as well, would be filtered client-side on every run.
+        """
+        route = (self.routes or {}).get(self.route_key(path))
+        if route is not None and {"after", "modified_after"} & set(route["args"]):
+            return "modified_after" in route["args"]
+        return self.store_supports_modified_after()
+
+    def store_supports_modified_after(self) -> bool:
+        """Return True if the store is WooCommerce 5.6 or later.
+
+        That is when some collection of the index takes `modified_after`,
+        else the version from `system_status`. As before, a recent store is
+        assumed when neither probe gave an answer.
+        """
+        if self.routes:
+            return any("modified_after" in route["args"] for route in self.routes.values())
+        if not self.version:
+            return True
+        try:
+            return tuple(int(part) for part in self.version.split(".")[:2]) >= (5, 6)
+        except ValueError:
+            logging.info(f"Non numeric WooCommerce version: {self.version}")
+            return True
+
+    @classmethod
+    def _probe(cls, stream: Any) -> "StoreCapabilities":
+        headers = dict(stream.http_headers)
+        headers.setdefault("User-Agent", stream.user_agents.get_random_user_agent())
+        headers.update(stream.authenticator.auth_headers or {})
+        site_url = stream.config["site_url"]
+        routes = None
+        try:
+            response = stream.requests_session.get(
+                url=f"{site_url}/wp-json/wc/v3", headers=headers, timeout=stream.timeout
+            )
+            routes = cls._summarize_routes(response.json()["routes"])
+        except:
+            stream.logger.info("WooCommerce route index unavailable, probing system_status.")
+        version = None
+        if routes is None:
+            try:
+                response = stream.requests_session.get(
+                    url=f"{site_url}/wp-json/wc/v3/system_status",
+                    headers=headers,
+                    timeout=stream.timeout,
+                )
+                version = response.json()["environment"]["version"]
+            except:
+                pass
+        return cls(routes, version)
+
+    @staticmethod
+    def _summarize_routes(routes: Dict[str, dict]) -> Dict[str, dict]:
+        """Keep the GET arguments of each route, keyed by a stream-style path."""
+        summary = {}
+        for route, description in routes.items():
+            key = ROUTE_PARAMETER.sub(r"{\1}", route)
+            args: Dict[str, dict] = {}
+            for endpoint in description.get("endpoints", []):
+                if "GET" in endpoint.get("methods", []):
+                    args.update(endpoint.get("args") or {})
+            summary[key] = {
+                "args": sorted(args),
+                "orderby": (args.get("orderby") or {}).get("enum", []),
+            }
+        return summary
+
+    @staticmethod
+    def _cache_path(config: dict) -> str:
+        return config.get("capability_cache_path") or DEFAULT_CACHE_PATH
+
+    @classmethod
+    def _read_cache(cls, config: dict, ttl: float) -> Optional["StoreCapabilities"]:
+        if not ttl:
+            return None
+        try:
+            with open(cls._cache_path(config)) as cache_file:
+                entry = json.load(cache_file)[config["site_url"]]
+        except (OSError, ValueError, KeyError):
+            return None
+        capabilities = cls(entry["routes"], entry.get("version"), entry["fetched_at"])
+        return None if capabilities.expired(ttl) else capabilities
+
+    @classmethod
+    def _write_cache(cls, config: dict, capabilities: "StoreCapabilities") -> None:
+        if not config.get("capability_cache_ttl", DEFAULT_CACHE_TTL):
+            return
+        path = cls._cache_path(config)
+        try:
+            with open(path) as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            cache = {}
+        cache[config["site_url"]] = {
+            "routes": capabilities.routes,
+            "version": capabilities.version,
+            "fetched_at": capabilities.fetched_at,
+        }
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+            with os.fdopen(fd, "w") as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(temp_path, path)
+        except OSError as exc:
+            logging.warning(f"Could not write capability cache {path}: {exc}")
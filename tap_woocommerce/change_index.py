@@ -0,0 +1,200 @@
+"""Local index of the records a tap has already emitted.
+
+Besides the `ChangeIndex` class used by the streams, this module is a small
+command line tool to maintain an index file:
+
+    python -m tap_woocommerce.change_index compact INDEX [--max-age-days DAYS]
+    python -m tap_woocommerce.change_index rebuild INDEX [SINGER_OUTPUT ...]
+
+`compact` forgets records not emitted for `--max-age-days` days and shrinks
+the file. `rebuild` empties the index and fills it again from the RECORD
+messages of earlier tap output (files or standard input).
+"""
+
+import argparse
+import fileinput
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+
+def record_hash(record: dict) -> str:
+    """Return a digest of a record's content, independent of key order."""
+    content = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class ChangeIndex:
+    """SQLite table of the last version emitted per stream and record id.
+
+    Each entry keeps the record's `date_modified` and a hash of its content, so
+    records identical to what was last emitted can be dropped. Lookups and
+    writes go through the primary key and stay cheap with millions of rows.
+
+    New entries wait in a temporary table until the stream that emitted them
+    calls `commit` once it finished. Entries of an interrupted sync are never
+    written, so their records are emitted again by the next run.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " stream TEXT NOT NULL, id TEXT NOT NULL, date_modified TEXT,"
+            " PRIMARY KEY (stream, id)"
+            ") WITHOUT ROWID"
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(records)")]
+        if "hash" not in columns:
+            self._connection.execute("ALTER TABLE records ADD COLUMN hash TEXT")
+            self._connection.execute("ALTER TABLE records ADD COLUMN emitted_at REAL")
+        self._connection.execute(
+            "CREATE TEMP TABLE pending ("
+            " stream TEXT NOT NULL, id TEXT NOT NULL, date_modified TEXT, hash TEXT,"
+            " PRIMARY KEY (stream, id)"
+            ") WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["ChangeIndex"]:
+        """Return the index configured with `change_index_path`, if any."""
+        path = config.get("change_index_path")
+        return cls(path) if path else None
+
+    def seen(self, stream: str, record: dict, date_modified: Optional[str] = None) -> bool:
+        """Return True if the record was emitted before exactly as it is now.
+
+        Otherwise the record is added to the index, pending the next `commit`.
+        Entries rebuilt from tap output have no hash and match on a non-empty
+        `date_modified` instead.
+        """
+        record_id = str(record["id"])
+        content_hash = record_hash(record)
+        with self._lock:
+            row = None
+            for table in ("pending", "records"):
+                row = self._connection.execute(
+                    f"SELECT date_modified, hash FROM {table} WHERE stream = ? AND id = ?",
+                    (stream, record_id),
+                ).fetchone()
+                if row is not None:
+                    break
+            if row is not None:
+                if row[1] is not None and row[1] == content_hash:
+                    return True
+                if row[1] is None and date_modified is not None and row[0] == date_modified:
+                    return True
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?)",
+                (stream, record_id, date_modified, content_hash),
+            )
+        return False
+
+    def commit(self, stream: str) -> None:
+        """Write the pending entries of a stream whose records have all been emitted."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO records (stream, id, date_modified, hash, emitted_at)"
+                " SELECT stream, id, date_modified, hash, ? FROM pending WHERE stream = ?",
+                (time.time(), stream),
+            )
+            self._connection.execute("DELETE FROM pending WHERE stream = ?", (stream,))
+            self._connection.commit()
+
+    def discard(self, stream: str) -> None:
+        """Forget the pending entries of a stream whose output was not kept."""
+        with self._lock:
+            self._connection.execute("DELETE FROM pending WHERE stream = ?", (stream,))
+            self._connection.commit()
+
+    def compact(self, max_age_days: Optional[float] = None) -> int:
+        """Drop entries not emitted for `max_age_days` days and shrink the file.
+
+        Returns the number of entries dropped. A dropped record is emitted once
+        more the next time a sync reads it.
+        """
+        dropped = 0
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 24 * 60 * 60
+                dropped = self._connection.execute(
+                    "DELETE FROM records WHERE emitted_at IS NULL OR emitted_at < ?", (cutoff,)
+                ).rowcount
+                self._connection.commit()
+            self._connection.execute("VACUUM")
+        return dropped
+
+    def rebuild(self, messages: Iterable[str]) -> int:
+        """Replace the index with the records found in Singer output lines.
+
+        Returns the number of RECORD messages read. Only records with an `id`
+        are kept, and the last message of each record wins.
+        """
+        count = 0
+        now = time.time()
+
+        def rows() -> Iterable[tuple]:
+            nonlocal count
+            for line in messages:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(message, dict) or message.get("type") != "RECORD":
+                    continue
+                record = message.get("record") or {}
+                if record.get("id") is None:
+                    continue
+                count += 1
+                yield message["stream"], str(record["id"]), record.get("date_modified"), now
+
+        with self._lock:
+            self._connection.execute("DELETE FROM records")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO records (stream, id, date_modified, hash, emitted_at)"
+                " VALUES (?, ?, ?, NULL, ?)",
+                rows(),
+            )
+            self._connection.commit()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Maintain a change index file from the command line."""
+    parser = argparse.ArgumentParser(prog="python -m tap_woocommerce.change_index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="drop old entries and shrink the file")
+    compact.add_argument("index")
+    compact.add_argument("--max-age-days", type=float)
+    rebuild = commands.add_parser("rebuild", help="refill the index from tap output")
+    rebuild.add_argument("index")
+    rebuild.add_argument("inputs", nargs="*", help="Singer output files, default stdin")
+    args = parser.parse_args(argv)
+
+    index = ChangeIndex(args.index)
+    try:
+        if args.command == "compact":
+            dropped = index.compact(args.max_age_days)
+            print(f"Dropped {dropped} entries from {args.index}.")
+        else:
+            with fileinput.input(files=args.inputs or ("-",)) as lines:
+                count = index.rebuild(lines)
+            print(f"Indexed {count} records in {args.index}.")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""HTTP client shared by every WooCommerce stream of a tap run."""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tap_woocommerce.throttling import ConcurrencyController, RateLimiter
+
+
+def worker_connections(config: dict) -> int:
+    """Return how many requests the configured workers can have in flight at once.
+
+    Pages of the time windows, the child streams and the batches re-fetching
+    ids by `include` can all be in flight together.
+    """
+    page_workers = max(int(config.get("page_workers", 1)), 1)
+    backfill_workers = max(int(config.get("backfill_workers", 1)), 1)
+    child_workers = config.get("child_stream_workers", 1)
+    if isinstance(child_workers, dict):
+        child_workers = max(child_workers.values(), default=1)
+    child_workers = max(int(child_workers), 1)
+    refetch_workers = max(int(config.get("refetch_workers", 4)), 1)
+    return page_workers * backfill_workers + child_workers + refetch_workers + 2
+
+
+def default_pool_size(config: dict) -> int:
+    """Return a connection pool size large enough for the configured concurrency."""
+    return max(10, worker_connections(config))
+
+
+class WooCommerceHttpClient:
+    """Connection pool and request sending for all streams of a tap.
+
+    Streams share one `requests.Session`, so TCP connections and TLS sessions
+    to the store are reused across streams and the many child-stream requests.
+    The keep-alive pool holds `connection_pool_size` connections, by default
+    enough for the configured concurrency.
+
+    Requests go through an adaptive concurrency limit (see
+    `ConcurrencyController`) unless `adaptive_concurrency` is false, and,
+    with `max_requests_per_second` set, through a `RateLimiter` shared with
+    the other taps on this machine syncing the same store.
+
+    With `hedge_requests` enabled, a GET that is still waiting for its
+    response after the `hedge_percentile` (default 95th) percentile of
+    recent response times is sent a second time, and whichever copy answers
+    first is used. Hedges are capped at `hedge_budget` (default 5%) of all
+    requests. A request cannot be aborted once sent, so the slower copy is
+    closed as soon as it completes.
+    """
+
+    def __init__(self, config: dict) -> None:
+        self.config = config
+        self.pool_size = int(config.get("connection_pool_size") or default_pool_size(config))
+        if self.pool_size < worker_connections(config):
+            logging.warning(
+                f"connection_pool_size {self.pool_size} is below the "
+                f"{worker_connections(config)} requests the configured workers can have "
+                "in flight, the others wait or use connections that are not kept alive"
+            )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.concurrency = ConcurrencyController.from_config(config, self.pool_size)
+        self.rate_limiter = RateLimiter.from_config(config)
+        self.hedging = bool(config.get("hedge_requests"))
+        self.hedge_percentile = float(config.get("hedge_percentile", 95))
+        self.hedge_budget = float(config.get("hedge_budget", 0.05))
+        self.hedge_min_delay = float(config.get("hedge_min_delay", 1))
+        self.requests_sent = 0
+        self.hedges_sent = 0
+        self._latencies: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def send(
+        self, prepared_request: requests.PreparedRequest, timeout: int, stream: bool = False
+    ) -> requests.Response:
+        """Send a prepared request through the shared pool."""
+        if self.hedging and prepared_request.method == "GET":
+            return self._send_hedged(prepared_request, timeout, stream)
+        return self._send(prepared_request, timeout, stream)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return how long to wait before hedging, or None if there is no estimate yet."""
+        with self._lock:
+            if len(self._latencies) < 20:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(int(len(latencies) * self.hedge_percentile / 100), len(latencies) - 1)
+        return max(latencies[index], self.hedge_min_delay)
+
+    def _send_hedged(
+        self, prepared_request: requests.PreparedRequest, timeout: int, stream: bool
+    ) -> requests.Response:
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._send(prepared_request, timeout, stream)
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=2 * self.pool_size, thread_name_prefix="hedge"
+                    )
+        futures = [self._executor.submit(self._send, prepared_request, timeout, stream)]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._take_hedge():
+            futures.append(
+                self._executor.submit(self._send, prepared_request.copy(), timeout, stream)
+            )
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None:
+                for future in futures:
+                    if future is not winner:
+                        future.add_done_callback(self._close_response)
+                return winner.result()
+        return futures[0].result()
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges_sent + 1 > self.hedge_budget * self.requests_sent:
+                return False
+            self.hedges_sent += 1
+            return True
+
+    @staticmethod
+    def _close_response(future: Future) -> None:
+        if future.exception() is None:
+            future.result().close()
+
+    def _send(
+        self, prepared_request: requests.PreparedRequest, timeout: int, stream: bool
+    ) -> requests.Response:
+        started = time.monotonic()
+        response = self._send_throttled(prepared_request, timeout, stream)
+        with self._lock:
+            self.requests_sent += 1
+            if response.status_code < 400:
+                self._latencies.append(time.monotonic() - started)
+        return response
+
+    def _send_throttled(
+        self, prepared_request: requests.PreparedRequest, timeout: int, stream: bool
+    ) -> requests.Response:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.concurrency is None:
+            return self.session.send(prepared_request, timeout=timeout, stream=stream)
+        self.concurrency.acquire()
+        started = time.monotonic()
+        try:
+            response = self.session.send(prepared_request, timeout=timeout, stream=stream)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            self.concurrency.release(overloaded=True)
+            raise
+        except BaseException:
+            self.concurrency.release()
+            raise
+        self.concurrency.release(response, time.monotonic() - started)
+        return response
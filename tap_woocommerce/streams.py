@@ -24,6 +24,10 @@ class ProductsStream(WooCommerceStream):
     path = "products"
     primary_keys = ["id"]
     replication_key = "date_modified"
+    supports_refetch = True
+    supports_cursor_pagination = True
+    supports_time_windows = True
+    required_fields = ["type"]
     schema = th.PropertiesList(
         th.Property("id", th.IntegerType),
         th.Property("name", th.StringType),
@@ -160,9 +164,9 @@ class ProductsStream(WooCommerceStream):
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """Return a context dictionary for child streams."""
         if record.get("type")=="variable":
-            return {
+            return self.add_child_hints(record, {
                 "product_id": record["id"],
-            }  
+            })
 
 
 class OrdersStream(WooCommerceStream):
@@ -170,6 +174,9 @@ class OrdersStream(WooCommerceStream):
     path = "orders"
     primary_keys = ["id"]
     replication_key = "date_modified"
+    supports_refetch = True
+    supports_cursor_pagination = True
+    supports_time_windows = True
 
     
     meta_data_property = th.Property(
@@ -377,9 +384,9 @@ class OrdersStream(WooCommerceStream):
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """Return a context dictionary for child streams."""
         
-        return {
+        return self.add_child_hints(record, {
                 "order_id": record["id"],
-            }
+            })
 
 
 class CouponsStream(WooCommerceStream):
@@ -387,6 +394,9 @@ class CouponsStream(WooCommerceStream):
     path = "coupons"
     primary_keys = ["id"]
     replication_key = "date_modified"
+    supports_preflight = True
+    supports_cursor_pagination = True
+    supports_time_windows = True
 
     schema = th.PropertiesList(
         th.Property("id", th.IntegerType),
@@ -423,6 +433,7 @@ class ProductVarianceStream(WooCommerceStream):
     path = "products/{product_id}/variations"
     primary_keys = ["id"]
     parent_stream_type = ProductsStream
+    parent_record_hint = "variations"
 
     schema = th.PropertiesList(
     th.Property("id", th.IntegerType),
@@ -505,6 +516,9 @@ class SubscriptionStream(WooCommerceStream):
     path = "subscriptions"
     primary_keys = ["id"]
     replication_key = "date_modified"
+    supports_preflight = True
+    supports_cursor_pagination = True
+    supports_time_windows = True
     schema = th.PropertiesList(
         th.Property("id", th.IntegerType),
         th.Property("parent_id", th.NumberType),
@@ -699,6 +713,7 @@ class CustomersStream(WooCommerceStream):
     path = "customers"
     primary_keys = ["id"]
     replication_key = "date_modified"
+    supports_preflight = True
     schema = th.PropertiesList(
         th.Property("id", th.IntegerType),
         th.Property("date_created", th.DateTimeType),
@@ -809,6 +824,9 @@ class OrdersRefundsStream(WooCommerceStream):
     path = "orders/{order_id}/refunds"
     primary_keys = ["id"]
     parent_stream_type = OrdersStream
+    parent_record_hint = "refunds"
+    bulk_path = "refunds"
+    bulk_required_fields = ["parent_id"]
     replication_key = None
     
     schema = th.PropertiesList(
@@ -895,5 +913,5 @@ class OrdersRefundsStream(WooCommerceStream):
     ).to_dict()
     
     def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
-        row['order_id']  = context.get("order_id")
+        row['order_id']  = context.get("order_id") if context else row.get("parent_id")
         return row
@@ -1,6 +1,14 @@
 """WooCommerce tap class."""
 
-from typing import List
+import contextlib
+import copy
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from hotglue_singer_sdk import Stream, Tap
 from hotglue_singer_sdk import typing as th  # JSON schema typing helpers
@@ -9,6 +17,9 @@ from hotglue_etl_exceptions import InvalidCredentialsError
 from hotglue_singer_sdk.exceptions import FatalAPIError
 import requests
 
+from tap_woocommerce.change_index import ChangeIndex
+from tap_woocommerce.http_client import WooCommerceHttpClient
+from tap_woocommerce.webhooks import WebhookJournal
 from tap_woocommerce.streams import (
     ProductsStream, 
     OrdersStream, 
@@ -53,6 +64,213 @@ class TapWooCommerce(Tap):
         th.Property("start_date", th.DateTimeType, default="2000-01-01T00:00:00.000Z")
     ).to_dict()
 
+    _http_client = None
+    _change_index = None
+    _refetch_ids = None
+    _webhook_journal = None
+    _journal_ids = None
+    _stop_daemon = None
+    # Streams the daemon polled once, which are done with the configured ids.
+    _refetched_streams = frozenset()
+
+    @property
+    def http_client(self) -> WooCommerceHttpClient:
+        """Return the HTTP client whose connection pool all streams share."""
+        if self._http_client is None:
+            self._http_client = WooCommerceHttpClient(self.config)
+        return self._http_client
+
+    @property
+    def change_index(self) -> Optional[ChangeIndex]:
+        """Return the index of emitted records, if `change_index_path` is set."""
+        if self._change_index is None:
+            self._change_index = ChangeIndex.from_config(self.config)
+        return self._change_index
+
+    @property
+    def webhook_journal(self) -> Optional[WebhookJournal]:
+        """Return the journal of webhook changes, if `webhook_journal_path` is set."""
+        if self._webhook_journal is None:
+            self._webhook_journal = WebhookJournal.from_config(self.config)
+        return self._webhook_journal
+
+    @property
+    def journal_ids(self) -> Dict[str, List[Any]]:
+        """Return the record ids the webhook journal lists per stream name."""
+        if self._journal_ids is None:
+            journal = self.webhook_journal
+            self._journal_ids = journal.read() if journal is not None else {}
+        return self._journal_ids
+
+    @property
+    def refetch_ids(self) -> Dict[str, List[Any]]:
+        """Return the record ids to re-fetch per stream name.
+
+        Ids come from the `refetch_ids` mapping, the JSON file named by
+        `refetch_ids_file` and, with `webhook_journal_only`, the webhook
+        journal, in that order and without duplicates. The journal's streams
+        then only sync from it, even when it is empty. The daemon re-fetches
+        the configured ids in the first poll of each stream only.
+        """
+        if self._refetch_ids is None:
+            mappings = [self.config.get("refetch_ids") or {}]
+            if self.config.get("refetch_ids_file"):
+                with open(self.config["refetch_ids_file"]) as ids_file:
+                    mappings.append(json.load(ids_file))
+            mappings = [
+                {name: ids for name, ids in mapping.items() if name not in self._refetched_streams}
+                for mapping in mappings
+            ]
+            if self.config.get("webhook_journal_only"):
+                mappings.append(self.journal_ids)
+            refetch_ids: Dict[str, List[Any]] = {}
+            for mapping in mappings:
+                for stream_name, ids in mapping.items():
+                    stream_ids = refetch_ids.setdefault(stream_name, [])
+                    stream_ids.extend(ids)
+            self._refetch_ids = {
+                stream_name: list(dict.fromkeys(ids)) for stream_name, ids in refetch_ids.items()
+            }
+        return self._refetch_ids
+
+    def run_sync(self, catalog: Any = None, state: Any = None) -> None:
+        """Sync all streams, then the child streams read in bulk.
+
+        With `daemon_mode` set, the streams are polled until stopped instead,
+        see `run_daemon`.
+        """
+        if self.config.get("daemon_mode"):
+            self.register_streams_from_catalog(catalog)
+            self.register_state_from_file(state)
+            self.run_daemon()
+            return
+        super().run_sync(catalog=catalog, state=state)
+        self.sync_bulk_child_streams()
+
+    def sync_bulk_child_streams(self) -> None:
+        """Sync the child streams read from their top-level collection.
+
+        `sync_all` leaves child streams to their parents, which skip the ones
+        in bulk mode, see `WooCommerceStream.bulk_mode`.
+        """
+        for stream in self.streams.values():
+            if stream.parent_stream_type and stream.selected and stream.bulk_mode:
+                stream.sync()
+                stream.finalize_state_progress_markers()
+                stream.log_sync_costs()
+
+    def run_daemon(self) -> None:
+        """Keep polling the selected streams, each on its own interval.
+
+        A stream is synced again `poll_interval_seconds` (default 300) after
+        its last poll finished, or after its entry in `stream_poll_intervals`.
+        The process, the HTTP connection pool and the capability cache stay
+        warm between polls, and bookmarks carry over from one poll to the next.
+        Every poll ends with a STATE message.
+
+        Polls are written to stdout as one continuous Singer stream or, with
+        `daemon_output_dir`, each to its own file there, given its final name
+        once complete. A poll that fails is logged and its bookmarks rolled
+        back, and it is tried again after the interval, doubled for every
+        failed poll in a row up to 32 times. SIGTERM and SIGINT stop the
+        daemon once the running poll is done.
+        """
+        self._prepare_state_and_replication_methods()
+        # Top-level streams sync their children; bulk children are polled alone.
+        streams = [
+            stream for stream in self.streams.values()
+            if stream.selected and (not stream.parent_stream_type or stream.bulk_mode)
+            or not stream.parent_stream_type and stream.has_selected_descendents
+        ]
+        if not streams:
+            self.logger.info("No streams selected, the daemon has nothing to poll.")
+            return
+        self._stop_daemon = threading.Event()
+        previous_handlers = {}
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            try:
+                previous_handlers[signal_number] = signal.signal(
+                    signal_number, lambda *_: self.stop_daemon()
+                )
+            except ValueError:
+                # Signals can only be handled on the main thread.
+                pass
+        next_poll = {stream.name: 0.0 for stream in streams}
+        failed_polls = {stream.name: 0 for stream in streams}
+        try:
+            while not self._stop_daemon.is_set():
+                now = time.monotonic()
+                due = [stream for stream in streams if next_poll[stream.name] <= now]
+                if not due:
+                    self._stop_daemon.wait(min(next_poll.values()) - now)
+                    continue
+                for stream in due:
+                    if self._stop_daemon.is_set():
+                        break
+                    if self._poll_stream(stream):
+                        failed_polls[stream.name] = 0
+                    else:
+                        failed_polls[stream.name] += 1
+                    backoff = 2 ** min(failed_polls[stream.name], 5)
+                    interval = self.poll_interval(stream.name) * backoff
+                    next_poll[stream.name] = time.monotonic() + interval
+        finally:
+            for signal_number, handler in previous_handlers.items():
+                signal.signal(signal_number, handler)
+            for stream in self.streams.values():
+                stream.log_sync_costs()
+        self.logger.info("Daemon stopped.")
+
+    def stop_daemon(self) -> None:
+        """Stop `run_daemon` once the running poll is done."""
+        if self._stop_daemon is not None:
+            self._stop_daemon.set()
+
+    def poll_interval(self, stream_name: str) -> float:
+        """Return how many seconds the daemon waits between polls of a stream."""
+        intervals = self.config.get("stream_poll_intervals") or {}
+        return float(intervals.get(stream_name, self.config.get("poll_interval_seconds", 300)))
+
+    def _poll_stream(self, stream: Stream) -> bool:
+        """Sync one stream for the daemon and return whether it succeeded, see `run_daemon`."""
+        output_dir = self.config.get("daemon_output_dir")
+        batch_path = None
+        if output_dir:
+            timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+            batch_path = os.path.join(output_dir, f"{timestamp}-{stream.name}.jsonl")
+        bookmarks = self.state.setdefault("bookmarks", {})
+        saved_bookmarks = copy.deepcopy(bookmarks)
+        # Pick up the changes journaled since the last poll.
+        self._journal_ids = None
+        self._refetch_ids = None
+        try:
+            with contextlib.ExitStack() as stack:
+                if batch_path:
+                    batch_file = stack.enter_context(open(f"{batch_path}.partial", "w"))
+                    stack.enter_context(contextlib.redirect_stdout(batch_file))
+                stream.sync()
+                stream.finalize_state_progress_markers()
+                stream._write_state_message()
+            if batch_path:
+                os.replace(f"{batch_path}.partial", batch_path)
+        except Exception:
+            self.logger.exception(f"Polling '{stream.name}' failed, backing off")
+            bookmarks.clear()
+            bookmarks.update(saved_bookmarks)
+            for synced_stream in [stream, *stream.descendent_streams]:
+                synced_stream._pending_child_contexts = None
+                synced_stream._prefetched_records = None
+                if batch_path and self.change_index is not None:
+                    # The records of the discarded batch count as never emitted.
+                    self.change_index.discard(synced_stream.name)
+            if batch_path:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(f"{batch_path}.partial")
+            return False
+        polled = {synced_stream.name for synced_stream in [stream, *stream.descendent_streams]}
+        self._refetched_streams = self._refetched_streams | polled
+        return True
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
         return [stream_class(tap=self) for stream_class in STREAM_TYPES]
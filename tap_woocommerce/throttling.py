@@ -0,0 +1,252 @@
+"""Request throttling shared by every WooCommerce stream of a tap run."""
+
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Return the delay a `Retry-After` header asks for, in seconds."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket capping the request rate to one store across processes.
+
+    Taps on the same machine that sync the same `site_url` share the bucket
+    through a small state file, locked with `fcntl` while tokens are taken.
+    The file goes to `directory`, by default a directory of the user's own in
+    the temporary directory, only readable by them.
+    The bucket refills at `rate` tokens per second up to `burst` tokens, and
+    every request takes one. Where the file cannot be used the bucket only
+    covers this process.
+    """
+
+    def __init__(
+        self, site_url: str, rate: float, burst: float, directory: Optional[str] = None
+    ) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        key = hashlib.sha256(site_url.encode()).hexdigest()[:16]
+        self.shared = fcntl is not None
+        # Checked before first use, as anyone can create it ahead of the user.
+        self.private_directory = None
+        if directory is None and self.shared:
+            directory = os.path.join(tempfile.gettempdir(), f"tap-woocommerce-{os.getuid()}")
+            self.private_directory = directory
+        file_name = f"tap-woocommerce-{key}.bucket"
+        self.path = os.path.join(directory or tempfile.gettempdir(), file_name)
+        self._bucket = [self.burst, time.time()]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["RateLimiter"]:
+        """Return the rate limiter configured for a tap, or None when there is none."""
+        rate = config.get("max_requests_per_second")
+        if not rate:
+            return None
+        return cls(
+            config["site_url"],
+            rate=float(rate),
+            burst=float(config.get("rate_limit_burst") or rate),
+            directory=config.get("rate_limit_dir"),
+        )
+
+    def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _take(self) -> float:
+        """Take a token if there is one, else return how long to wait for it."""
+        with self._lock:
+            if self.shared:
+                try:
+                    return self._take_from_file()
+                except OSError as exc:
+                    logging.warning(
+                        f"Rate limit file {self.path} unusable, limiting this process only: {exc}"
+                    )
+                    self.shared = False
+            return self._refill_and_take(self._bucket)
+
+    def _take_from_file(self) -> float:
+        if self.private_directory:
+            self._make_private_directory(self.private_directory)
+            self.private_directory = None
+        # Never follow a link someone else put in place of the file.
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR | os.O_NOFOLLOW, 0o600)
+        with os.fdopen(fd, "r+") as bucket_file:
+            fcntl.flock(bucket_file, fcntl.LOCK_EX)
+            bucket_file.seek(0)
+            try:
+                bucket = json.loads(bucket_file.read())
+            except ValueError:
+                bucket = [self.burst, time.time()]
+            wait = self._refill_and_take(bucket)
+            bucket_file.seek(0)
+            bucket_file.truncate()
+            bucket_file.write(json.dumps(bucket))
+        return wait
+
+    @staticmethod
+    def _make_private_directory(directory: str) -> None:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        info = os.lstat(directory)
+        if (
+            not stat.S_ISDIR(info.st_mode)
+            or info.st_uid != os.getuid()
+            or stat.S_IMODE(info.st_mode) & 0o077
+        ):
+            raise PermissionError(f"{directory} is not a directory private to this user")
+
+    def _refill_and_take(self, bucket: List[float]) -> float:
+        now = time.time()
+        tokens = min(self.burst, bucket[0] + max(now - bucket[1], 0.0) * self.rate)
+        bucket[:] = [tokens, now]
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        return (1 - tokens) / self.rate
+
+
+class ConcurrencyController:
+    """Additive-increase/multiplicative-decrease limit on requests in flight.
+
+    Every request takes a slot with `acquire` and gives it back with `release`.
+    While responses are fast and successful the limit grows by about one slot
+    per round of requests, up to `max_limit`. A 429 or 503 response, or a
+    timeout, halves it, at most once per typical response time so a burst of
+    concurrent failures counts as one. A `Retry-After` header also holds back
+    new requests until the delay has passed.
+
+    Responses count as slow when they take more than `latency_tolerance` times
+    the fastest recent response time; slow responses stop the limit growing.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        latency_tolerance: float = 2.0,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = min(max(min_limit, 1), self.max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._latency: Optional[float] = None
+        self._base_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._reported_limit: Optional[int] = None
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config: dict, pool_size: int) -> Optional["ConcurrencyController"]:
+        """Return the controller configured for a tap, or None when it is disabled."""
+        if not config.get("adaptive_concurrency", True):
+            return None
+        return cls(
+            max_limit=int(config.get("max_concurrency") or pool_size),
+            min_limit=int(config.get("min_concurrency", 1)),
+            latency_tolerance=float(config.get("latency_tolerance", 2.0)),
+        )
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def acquire(self) -> None:
+        """Wait for a free slot and for any `Retry-After` delay to pass."""
+        with self._condition:
+            while True:
+                wait = self.blocked_until - time.monotonic()
+                if wait <= 0 and self.in_flight < self.current_limit:
+                    self.in_flight += 1
+                    return
+                self._condition.wait(wait if wait > 0 else None)
+
+    def release(
+        self,
+        response: Optional[requests.Response] = None,
+        elapsed: Optional[float] = None,
+        overloaded: bool = False,
+    ) -> None:
+        """Give back a slot and adjust the limit to how the request went.
+
+        Set `overloaded` for requests that failed without a response because
+        the store did not answer in time.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if response is None:
+                if overloaded:
+                    self._decrease()
+            elif response.status_code in OVERLOAD_STATUS_CODES:
+                self._decrease()
+                delay = retry_after_seconds(response)
+                if delay:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            elif response.status_code < 400 and elapsed is not None:
+                self._observe_latency(elapsed)
+                if elapsed <= self._base_latency * self.latency_tolerance:
+                    self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+            self._condition.notify_all()
+
+    def take_limit_change(self) -> Optional[int]:
+        """Return the current limit if it changed since the last call."""
+        with self._condition:
+            if self.current_limit == self._reported_limit:
+                return None
+            self._reported_limit = self.current_limit
+            return self._reported_limit
+
+    def _observe_latency(self, elapsed: float) -> None:
+        if self._latency is None:
+            self._latency = self._base_latency = elapsed
+            return
+        self._latency = 0.8 * self._latency + 0.2 * elapsed
+        # Let the baseline drift up slowly, so one fast response does not stick.
+        self._base_latency = min(elapsed, self._base_latency * 1.01)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self._latency or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * self.decrease_factor, float(self.min_limit))
@@ -0,0 +1,228 @@
+"""Receiver for WooCommerce webhooks, journaling the records they report changed.
+
+WooCommerce can POST a record to a URL whenever it changes. The receiver in
+this module checks each delivery's `X-WC-Webhook-Signature` against the
+webhook secret and writes the changed order or product id to a journal. A tap
+run with the same `webhook_journal_path` re-fetches those records by id (see
+`refetch_ids`) after its usual bookmark sync, so changes that happened during
+the sync are not missed. Set `webhook_journal_only` to sync orders and
+products from the journal alone, skipping the date-based requests:
+
+    python -m tap_woocommerce.webhooks serve --config CONFIG [--host HOST] [--port PORT]
+    python -m tap_woocommerce.webhooks send URL --secret SECRET --topic TOPIC [PAYLOAD]
+
+`serve` runs the receiver with the `webhook_secret` and `webhook_journal_path`
+of a tap config. `send` posts a signed delivery of a JSON payload (a file or
+standard input), as WooCommerce would, for trying out a receiver locally.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+# Webhook resources and the streams that re-fetch their records.
+RESOURCE_STREAMS = {"order": "orders", "product": "products"}
+JOURNALED_EVENTS = ("created", "updated", "restored")
+
+
+def webhook_signature(secret: str, body: bytes) -> str:
+    """Return the `X-WC-Webhook-Signature` WooCommerce sends with a body."""
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+class WebhookJournal:
+    """SQLite table of the record ids changed since a tap last fetched them.
+
+    Each stream and id is kept once, however often it changes. Every change
+    gets a new sequence number, so `acknowledge` only forgets the changes a
+    tap has read, and a record changed again meanwhile is fetched next time.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._read_up_to: Dict[str, int] = {}
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " stream TEXT NOT NULL, id INTEGER NOT NULL, topic TEXT, received_at REAL,"
+            " UNIQUE (stream, id)"
+            ")"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["WebhookJournal"]:
+        """Return the journal configured with `webhook_journal_path`, if any."""
+        path = config.get("webhook_journal_path")
+        return cls(path) if path else None
+
+    def record(self, stream: str, record_id: int, topic: Optional[str] = None) -> None:
+        """Note that a record of a stream changed."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO changes (stream, id, topic, received_at)"
+                " VALUES (?, ?, ?, ?)",
+                (stream, record_id, topic, time.time()),
+            )
+            self._connection.commit()
+
+    def read(self) -> Dict[str, List[int]]:
+        """Return the changed ids of every journaled stream, oldest change first."""
+        changes: Dict[str, List[int]] = {stream: [] for stream in RESOURCE_STREAMS.values()}
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT seq, stream, id FROM changes ORDER BY seq"
+            ).fetchall()
+        for seq, stream, record_id in rows:
+            changes.setdefault(stream, []).append(record_id)
+            self._read_up_to[stream] = seq
+        return changes
+
+    def acknowledge(self, stream: str) -> None:
+        """Forget the changes of a stream returned by the last `read`."""
+        seq = self._read_up_to.pop(stream, None)
+        if seq is None:
+            return
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM changes WHERE stream = ? AND seq <= ?", (stream, seq)
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Journal the id of every correctly signed order or product delivery."""
+
+    server: "WebhookReceiver"
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        topic = self.headers.get("X-WC-Webhook-Topic")
+        if topic is None:
+            # WooCommerce pings a new webhook with `webhook_id=<id>`, unsigned.
+            self._reply(200 if body.startswith(b"webhook_id=") else 400)
+            return
+        expected = webhook_signature(self.server.secret, body)
+        if not hmac.compare_digest(expected, self.headers.get("X-WC-Webhook-Signature", "")):
+            self._reply(401)
+            return
+        resource, _, event = topic.partition(".")
+        stream = RESOURCE_STREAMS.get(resource)
+        if stream is None or event not in JOURNALED_EVENTS:
+            self._reply(200)
+            return
+        try:
+            payload = json.loads(body)
+            record_id = int(payload["id"])
+        except (ValueError, TypeError, KeyError):
+            self._reply(400)
+            return
+        if stream == "products" and payload.get("type") == "variation":
+            # Variations are synced through their parent product.
+            record_id = int(payload.get("parent_id") or record_id)
+        self.server.journal.record(stream, record_id, topic)
+        self._reply(200)
+
+    def _reply(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class WebhookReceiver(ThreadingHTTPServer):
+    """HTTP server writing the deliveries of WooCommerce webhooks to a journal."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, secret: str, journal: WebhookJournal) -> None:
+        super().__init__(address, WebhookHandler)
+        self.secret = secret
+        self.journal = journal
+
+    @classmethod
+    def from_config(cls, config: dict, address: tuple) -> "WebhookReceiver":
+        """Return a receiver for the `webhook_secret` and journal of a tap config."""
+        journal = WebhookJournal.from_config(config)
+        if journal is None:
+            raise ValueError("`webhook_journal_path` is required to receive webhooks.")
+        return cls(address, config["webhook_secret"], journal)
+
+
+def send_webhook(
+    url: str, secret: str, topic: str, payload: dict, timeout: float = 30
+) -> requests.Response:
+    """Post a signed delivery of a payload to a receiver, as WooCommerce does."""
+    body = json.dumps(payload).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "X-WC-Webhook-Topic": topic,
+        "X-WC-Webhook-Resource": topic.partition(".")[0],
+        "X-WC-Webhook-Event": topic.partition(".")[2],
+        "X-WC-Webhook-Signature": webhook_signature(secret, body),
+    }
+    return requests.post(url, data=body, headers=headers, timeout=timeout)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a webhook receiver, or send it a delivery, from the command line."""
+    parser = argparse.ArgumentParser(prog="python -m tap_woocommerce.webhooks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="receive webhooks into the journal")
+    serve.add_argument("--config", required=True, help="tap config file")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    send = commands.add_parser("send", help="post a signed webhook delivery")
+    send.add_argument("url")
+    send.add_argument("--secret", required=True)
+    send.add_argument("--topic", required=True, help="e.g. order.updated")
+    send.add_argument("payload", nargs="?", help="JSON payload file, default stdin")
+    args = parser.parse_args(argv)
+
+    if args.command == "send":
+        if args.payload:
+            with open(args.payload) as payload_file:
+                payload = json.load(payload_file)
+        else:
+            payload = json.load(sys.stdin)
+        response = send_webhook(args.url, args.secret, args.topic, payload)
+        print(f"{response.status_code} {response.reason}")
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+    receiver = WebhookReceiver.from_config(config, (args.host, args.port))
+    logging.info(f"Receiving webhooks on {args.host}:{receiver.server_address[1]}.")
+    try:
+        receiver.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.server_close()
+        receiver.journal.close()
+
+
+if __name__ == "__main__":
+    main()
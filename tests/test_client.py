@@ -0,0 +1,292 @@
+"""Stream tests against a stand-in WooCommerce store."""
+
+import contextlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from tap_woocommerce.tap import TapWooCommerce
+
+
+def make_records(count: int) -> list:
+    return [
+        {
+            "id": record_id,
+            "date_created": f"2021-01-01T00:{record_id // 60:02}:{record_id % 60:02}",
+            "date_modified": f"2021-02-01T00:{record_id // 60:02}:{record_id % 60:02}",
+        }
+        for record_id in range(1, count + 1)
+    ]
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    """Stand-in WooCommerce REST API, set up through the class attributes.
+
+    `routes` maps collections to the GET arguments the route index lists and
+    `records` maps them to their records. A request whose collection and
+    offset are in `drop_once` gets its connection closed without a response,
+    and one in `malformed_once` a malformed JSON body, the first time only.
+    Pages holding a record in `broken_ids` fail unless only ids are asked for.
+    """
+
+    protocol_version = "HTTP/1.1"
+    routes: dict = {}
+    records: dict = {}
+    drop_once: set = set()
+    malformed_once: set = set()
+    broken_ids: set = set()
+    requests_seen: list = []
+    # Set once the connection that got a malformed body is closed.
+    malformed_closed = threading.Event()
+    served_malformed = False
+
+    def handle(self) -> None:
+        try:
+            super().handle()
+        finally:
+            if self.served_malformed:
+                self.malformed_closed.set()
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests_seen.append(self.path)
+        collection = url.path[len("/wp-json/wc/v3"):].strip("/")
+        if not collection:
+            routes = {
+                f"/wc/v3/{name}": {
+                    "endpoints": [{"methods": ["GET"], "args": {arg: {} for arg in args}}]
+                }
+                for name, args in self.routes.items()
+            }
+            return self._reply({"namespace": "wc/v3", "routes": routes})
+        if collection not in self.records:
+            return self._reply({"code": "rest_no_route"}, 404)
+        per_page = int(query.get("per_page", 10))
+        offset = int(query.get("offset", (int(query.get("page", 1)) - 1) * per_page))
+        if (collection, offset) in self.drop_once:
+            self.drop_once.discard((collection, offset))
+            self.close_connection = True
+            return
+        records = self.records[collection]
+        if "modified_after" in query:
+            records = [r for r in records if r["date_modified"] > query["modified_after"][:19]]
+        elif "after" in query:
+            records = [r for r in records if r["date_created"] > query["after"][:19]]
+        if "include" in query:
+            ids = {int(id) for id in query["include"].split(",")}
+            records = [r for r in records if r["id"] in ids]
+        broken = self.broken_ids & {r["id"] for r in records[offset:offset + per_page]}
+        if broken and "_fields" not in query:
+            return self._reply({"code": "internal_server_error"}, 500)
+        if "_fields" in query:
+            fields = query["_fields"].split(",")
+            records = [{key: r[key] for key in fields if key in r} for r in records]
+        headers = {"X-WP-Total": len(records), "X-WP-TotalPages": -(-len(records) // per_page)}
+        page = records[offset:offset + per_page]
+        if (collection, offset) in self.malformed_once:
+            self.malformed_once.discard((collection, offset))
+            self.served_malformed = True
+            # A broken record, then more body than a streaming parser reads at once.
+            body = json.dumps(page[:5])[:-1] + ", oops" + " " * 1024 * 1024 + "]"
+            return self._reply(body, headers=headers, raw=True)
+        self._reply(page, headers=headers)
+
+    def _reply(self, payload, status=200, headers=None, raw=False) -> None:
+        body = (payload if raw else json.dumps(payload)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def config(tmp_path):
+    StoreHandler.routes = {"orders": ["modified_after", "after"]}
+    StoreHandler.records = {"orders": make_records(30)}
+    StoreHandler.drop_once = set()
+    StoreHandler.malformed_once = set()
+    StoreHandler.broken_ids = set()
+    StoreHandler.malformed_closed = threading.Event()
+    StoreHandler.requests_seen = []
+    store = ThreadingHTTPServer(("127.0.0.1", 0), StoreHandler)
+    threading.Thread(target=store.serve_forever, daemon=True).start()
+    yield {
+        "consumer_key": "ck",
+        "consumer_secret": "cs",
+        "site_url": f"http://127.0.0.1:{store.server_address[1]}",
+        "start_date": "2020-01-01T00:00:00Z",
+        "capability_cache_path": str(tmp_path / "capabilities.json"),
+    }
+    store.shutdown()
+
+
+def run_tap(config: dict, streams=("orders",), state=None, deselected=()) -> list:
+    """Run the tap, without the `deselected` properties, and return its messages."""
+    tap = TapWooCommerce(config=config, state=state, parse_env_config=False)
+    for name, stream in tap.streams.items():
+        for breadcrumb, metadata in stream.metadata.items():
+            metadata.selected = name in streams if breadcrumb == () else None
+            if breadcrumb[-1:] and breadcrumb[-1] in deselected:
+                metadata.selected = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tap.run_sync()
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def records(messages: list, stream: str) -> list:
+    return [
+        message["record"]["id"] for message in messages
+        if message["type"] == "RECORD" and message["stream"] == stream
+    ]
+
+
+def test_adaptive_pages_shrink_after_a_dropped_connection(config):
+    config.update(adaptive_page_size=True, per_page=10, min_per_page=5)
+    StoreHandler.drop_once = {("orders", 10)}
+
+    messages = run_tap(config)
+
+    assert records(messages, "orders") == list(range(1, 31))
+    assert not StoreHandler.drop_once
+    queries = [parse_qs(urlparse(path).query) for path in StoreHandler.requests_seen]
+    sizes = [int(query["per_page"][0]) for query in queries if query.get("offset") == ["10"]]
+    # The dropped page is requested again at half its size.
+    assert len(sizes) == 2 and sizes[1] == sizes[0] // 2
+
+
+def test_malformed_streamed_page_lets_go_of_its_connection_before_the_retry(config):
+    config.update(stream_json=True, per_page=10)
+    StoreHandler.malformed_once = {("orders", 10)}
+    closed_before_retry = []
+    do_get = StoreHandler.do_GET
+
+    def note_retry(handler):
+        if "page=2" in handler.path and not StoreHandler.malformed_once:
+            closed_before_retry.append(StoreHandler.malformed_closed.wait(2))
+        do_get(handler)
+
+    StoreHandler.do_GET = note_retry
+    try:
+        messages = run_tap(config)
+    finally:
+        StoreHandler.do_GET = do_get
+
+    assert records(messages, "orders") == list(range(1, 31))
+    # The connection still holding the rest of the malformed body was closed.
+    assert closed_before_retry == [True]
+
+
+def test_bulk_refunds_request_their_parent_and_bookmark_fields(config):
+    StoreHandler.routes["refunds"] = ["after"]
+    StoreHandler.records["refunds"] = [
+        dict(record, parent_id=record["id"] * 10, amount="1.00", reason="")
+        for record in make_records(3)
+    ]
+
+    messages = run_tap(config, streams=("orders_refunds",), deselected=("reason",))
+
+    refunds = [
+        message["record"] for message in messages
+        if message["type"] == "RECORD" and message["stream"] == "orders_refunds"
+    ]
+    assert [refund["order_id"] for refund in refunds] == [10, 20, 30]
+    assert all("reason" not in refund for refund in refunds)
+    state = [message for message in messages if message["type"] == "STATE"][-1]
+    bookmark = state["value"]["bookmarks"]["orders_refunds"]["bulk_date_created"]
+    assert bookmark == StoreHandler.records["refunds"][-1]["date_created"]
+
+
+@pytest.mark.parametrize(
+    "orders_args, date_filter, unused_filter",
+    [
+        (["modified_after", "after"], "modified_after", "after"),
+        (["after"], "after", "modified_after"),
+    ],
+)
+def test_customers_follow_the_store_date_filters(config, orders_args, date_filter, unused_filter):
+    # The customers collection takes no date filter on any WooCommerce version.
+    StoreHandler.routes = {"orders": orders_args, "customers": []}
+    StoreHandler.records["customers"] = make_records(20)
+    bookmark = {"replication_key": "date_modified", "replication_key_value": "2021-02-01T00:00:10"}
+    state = {"bookmarks": {"customers": bookmark}}
+
+    messages = run_tap(config, streams=("customers",), state=state)
+
+    assert records(messages, "customers") == list(range(11, 21))
+    for path in StoreHandler.requests_seen:
+        if "/customers" in path:
+            query = parse_qs(urlparse(path).query)
+            assert date_filter in query and unused_filter not in query
+
+
+def test_ignored_server_errors_give_up_after_21_failed_pages_in_a_row(config):
+    config.update(ignore_server_errors=True, per_page=4)
+    StoreHandler.records["orders"] = make_records(100)
+    StoreHandler.broken_ids = set(range(1, 101))
+
+    messages = run_tap(config)
+
+    assert records(messages, "orders") == []
+    pages = [
+        path for path in StoreHandler.requests_seen
+        if "/orders" in path and "include=" not in path and "_fields=id" not in path
+    ]
+    # The requests bisecting each failed page do not count towards giving up.
+    assert len(pages) == 21
+
+
+def test_daemon_recovers_from_a_failed_poll_and_refetches_configured_ids_once(config, tmp_path):
+    output_dir = tmp_path / "polls"
+    output_dir.mkdir()
+    config.update(
+        daemon_mode=True,
+        daemon_output_dir=str(output_dir),
+        poll_interval_seconds=0.05,
+        refetch_ids={"orders": [3, 7]},
+    )
+    tap = TapWooCommerce(config=config, parse_env_config=False)
+    for name, stream in tap.streams.items():
+        for breadcrumb, metadata in stream.metadata.items():
+            metadata.selected = name == "orders" if breadcrumb == () else None
+    orders = tap.streams["orders"]
+    sync = orders.sync
+    calls = []
+
+    def fail_first_poll(*args, **kwargs):
+        calls.append(None)
+        if len(calls) == 1:
+            raise ValueError("unexpected payload")
+        sync(*args, **kwargs)
+
+    orders.sync = fail_first_poll
+    daemon = threading.Thread(target=tap.run_sync)
+    daemon.start()
+    for _ in range(100):
+        if len(list(output_dir.glob("*.jsonl"))) >= 2:
+            break
+        daemon.join(0.05)
+    tap.stop_daemon()
+    daemon.join(5)
+
+    assert not daemon.is_alive()
+    assert not list(output_dir.glob("*.partial"))
+    batches = [
+        [json.loads(line) for line in path.read_text().splitlines()]
+        for path in sorted(output_dir.glob("*.jsonl"))
+    ]
+    # The failed poll left no batch, the next one re-fetched the configured
+    # ids and the one after synced incrementally.
+    assert records(batches[0], "orders") == [3, 7]
+    assert records(batches[1], "orders") == list(range(1, 31))
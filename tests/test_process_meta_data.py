@@ -0,0 +1,167 @@
+"""Equivalence tests for `WooCommerceStream.process_meta_data`.
+
+The in-place implementation must produce the same rows as the previous one,
+kept below as `reference_process_meta_data`, which deep-copied every level.
+"""
+
+import copy
+import json
+import random
+from datetime import datetime
+
+import pytest
+
+from tap_woocommerce.tap import TapWooCommerce
+
+PROPERTY_NAMES = ["id", "status", "line_items", "billing", "taxes", "name", "total"]
+
+
+def reference_process_meta_data(row: dict) -> dict:
+    """`process_meta_data` as it was before it rewrote rows in place."""
+    new_row = copy.deepcopy(row)
+    for key, value in row.items():
+        if key == "meta_data":
+            for index, meta_data in enumerate(value):
+                if not meta_data or isinstance(meta_data["value"], str):
+                    continue
+                elif meta_data["value"] is not None:
+                    try:
+                        new_row[key][index]["value"] = json.dumps(meta_data["value"])
+                    except:
+                        new_row[key][index]["value"] = str(meta_data["value"])
+                elif meta_data["value"] is None:
+                    new_row[meta_data["key"]] = ""
+        elif isinstance(value, list) and value:
+            new_list = []
+            for item in value:
+                if isinstance(item, dict):
+                    new_list.append(reference_process_meta_data(item))
+                else:
+                    new_list.append(item)
+            new_row[key] = new_list
+        elif isinstance(value, dict) and any(isinstance(v, dict) for v in value.values()):
+            new_row[key] = reference_process_meta_data(value)
+    return copy.deepcopy(new_row)
+
+
+@pytest.fixture(scope="module")
+def stream():
+    tap = TapWooCommerce(
+        config={
+            "consumer_key": "ck",
+            "consumer_secret": "cs",
+            "site_url": "https://example.com",
+        },
+        parse_env_config=False,
+    )
+    return tap.streams["orders"]
+
+
+def random_scalar(rnd: random.Random):
+    return rnd.choice([None, True, 0, 12, 3.5, "", "text", datetime(2020, 1, 1)])
+
+
+def random_meta_value(rnd: random.Random, depth: int):
+    kind = rnd.randrange(6)
+    if kind == 0 and depth > 0:
+        return {"a": random_meta_value(rnd, depth - 1), "b": [1, "x"]}
+    if kind == 1 and depth > 0:
+        return [random_meta_value(rnd, depth - 1) for _ in range(rnd.randrange(3))]
+    if kind == 2:
+        return {1, 2}  # Not JSON serializable, so it is stored with str().
+    return random_scalar(rnd)
+
+
+def random_meta_data(rnd: random.Random) -> list:
+    entries = []
+    for index in range(rnd.randrange(5)):
+        if rnd.random() < 0.1:
+            entries.append(rnd.choice([{}, None]))
+            continue
+        # Keys may name an existing property, which a None value overwrites.
+        key = rnd.choice(PROPERTY_NAMES + ["_custom", "_other"])
+        entries.append({"id": index, "key": key, "value": random_meta_value(rnd, 2)})
+    return entries
+
+
+def random_row(rnd: random.Random, depth: int = 3) -> dict:
+    row = {}
+    names = rnd.sample(PROPERTY_NAMES, rnd.randrange(len(PROPERTY_NAMES)))
+    if rnd.random() < 0.7:
+        # Anywhere in the key order, so overwritten properties come before or after it.
+        names.insert(rnd.randrange(len(names) + 1), "meta_data")
+    for name in names:
+        if name == "meta_data":
+            row[name] = random_meta_data(rnd)
+            continue
+        kind = rnd.randrange(6)
+        if kind == 0 and depth > 0:
+            row[name] = [random_row(rnd, depth - 1) for _ in range(rnd.randrange(3))]
+        elif kind == 1 and depth > 0:
+            row[name] = random_row(rnd, depth - 1)
+        elif kind == 2 and depth > 0:
+            # Dicts holding only lists are not visited.
+            row[name] = {"lines": [random_row(rnd, depth - 1)], "ids": [1, 2]}
+        elif kind == 3 and depth > 0:
+            nested = random_row(rnd, depth - 1)
+            row[name] = [random_scalar(rnd), random_row(rnd, depth - 1), [nested]]
+        else:
+            row[name] = random_scalar(rnd)
+    return row
+
+
+def assert_equivalent(stream, row: dict) -> None:
+    expected = reference_process_meta_data(copy.deepcopy(row))
+    actual = stream.process_meta_data(copy.deepcopy(row))
+    assert json.dumps(actual, default=str) == json.dumps(expected, default=str)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_rows_match_reference(stream, seed):
+    rnd = random.Random(seed)
+    for _ in range(500):
+        assert_equivalent(stream, random_row(rnd))
+
+
+def test_none_value_overwrites_property_before_and_after_meta_data(stream):
+    meta_data = [{"id": 1, "key": "status", "value": None}, {"id": 2, "key": "x", "value": 5}]
+    assert_equivalent(stream, {"status": "done", "meta_data": meta_data})
+    assert_equivalent(stream, {"meta_data": meta_data, "status": "done"})
+    assert_equivalent(stream, {"line_items": [{"id": 1}], "meta_data": [
+        {"id": 1, "key": "line_items", "value": None},
+    ]})
+
+
+def test_nested_lists_and_dicts(stream):
+    row = {
+        "line_items": [
+            {"id": 1, "meta_data": [{"id": 1, "key": "k", "value": {"a": [1, 2]}}]},
+            "plain",
+            [{"meta_data": [{"id": 2, "key": "k", "value": 1}]}],
+        ],
+        "billing": {"address": {"meta_data": [{"id": 3, "key": "k", "value": None}]}},
+        "shipping": {"lines": [{"meta_data": [{"id": 4, "key": "k", "value": 2}]}]},
+    }
+    assert_equivalent(stream, row)
+
+
+def test_row_is_rewritten_in_place(stream):
+    row = {"meta_data": [{"id": 1, "key": "k", "value": [1]}]}
+    assert stream.process_meta_data(row) is row
+    assert row["meta_data"][0]["value"] == "[1]"
+
+
+def test_meta_key_named_meta_data(stream):
+    """The one intended difference from the reference implementation.
+
+    A None-valued entry whose key is "meta_data" replaces the list being
+    walked with "". The reference then indexed into that string and failed;
+    the in-place version finishes the walk and keeps the "".
+    """
+    row = {"meta_data": [
+        {"id": 1, "key": "meta_data", "value": None},
+        {"id": 2, "key": "k", "value": 1},
+    ]}
+    with pytest.raises((IndexError, TypeError)):
+        reference_process_meta_data(copy.deepcopy(row))
+    assert stream.process_meta_data(row) == {"meta_data": ""}
@@ -0,0 +1,182 @@
+"""Webhook receiver tests, from a signed delivery to the tap's `include` re-fetch."""
+
+import contextlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from tap_woocommerce.tap import TapWooCommerce
+from tap_woocommerce.webhooks import WebhookJournal, WebhookReceiver, send_webhook
+
+SECRET = "webhook-secret"
+RECORDS = [
+    {"id": record_id, "date_created": date, "date_modified": date}
+    for record_id, date in [
+        (1, "2021-01-01T00:00:00"),
+        (2, "2021-02-01T00:00:00"),
+        (3, "2021-03-01T00:00:00"),
+    ]
+]
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    """Stand-in WooCommerce REST API serving `RECORDS` as orders and products."""
+
+    requests_seen: list = []
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.requests_seen.append(self.path)
+        path = url.path[len("/wp-json/wc/v3"):]
+        if path in ("", "/"):
+            args = {"modified_after": {}, "orderby": {"enum": ["date", "modified", "id"]}}
+            routes = {
+                f"/wc/v3/{name}": {"endpoints": [{"methods": ["GET"], "args": args}]}
+                for name in ("orders", "products")
+            }
+            return self._reply({"namespace": "wc/v3", "routes": routes})
+        if path not in ("/orders", "/products"):
+            return self._reply({"code": "rest_no_route"}, 404)
+        records = RECORDS
+        if "include" in query:
+            ids = {int(id) for id in query["include"][0].split(",")}
+            records = [record for record in records if record["id"] in ids]
+        if "modified_after" in query:
+            after = query["modified_after"][0][:19]
+            records = [record for record in records if record["date_modified"] > after]
+        per_page = int(query.get("per_page", ["10"])[0])
+        start = (int(query.get("page", ["1"])[0]) - 1) * per_page
+        headers = {"X-WP-Total": len(records), "X-WP-TotalPages": -(-len(records) // per_page)}
+        self._reply(records[start:start + per_page], headers=headers)
+
+    def _reply(self, payload, status=200, headers=None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def start(server: ThreadingHTTPServer) -> str:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def config(tmp_path):
+    store = ThreadingHTTPServer(("127.0.0.1", 0), StoreHandler)
+    StoreHandler.requests_seen = []
+    yield {
+        "consumer_key": "ck",
+        "consumer_secret": "cs",
+        "site_url": start(store),
+        "start_date": "2020-01-01T00:00:00Z",
+        "capability_cache_path": str(tmp_path / "capabilities.json"),
+        "webhook_secret": SECRET,
+        "webhook_journal_path": str(tmp_path / "journal.db"),
+    }
+    store.shutdown()
+
+
+@pytest.fixture
+def receiver_url(config):
+    receiver = WebhookReceiver.from_config(config, ("127.0.0.1", 0))
+    yield start(receiver)
+    receiver.shutdown()
+    receiver.journal.close()
+
+
+def journaled(config) -> dict:
+    journal = WebhookJournal(config["webhook_journal_path"])
+    try:
+        return journal.read()
+    finally:
+        journal.close()
+
+
+def run_tap(config, state=None) -> list:
+    tap = TapWooCommerce(config=config, state=state, parse_env_config=False)
+    for name, stream in tap.streams.items():
+        for breadcrumb, metadata in stream.metadata.items():
+            metadata.selected = name in ("orders", "products") if breadcrumb == () else None
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tap.run_sync()
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def records(messages: list, stream: str) -> list:
+    return [
+        message["record"]["id"] for message in messages
+        if message["type"] == "RECORD" and message["stream"] == stream
+    ]
+
+
+def test_signed_deliveries_are_journaled(config, receiver_url):
+    for record_id in (3, 1, 3):
+        response = send_webhook(receiver_url, SECRET, "order.updated", {"id": record_id})
+        assert response.status_code == 200
+    assert journaled(config) == {"orders": [1, 3], "products": []}
+
+
+def test_bad_signature_is_rejected(config, receiver_url):
+    response = send_webhook(receiver_url, "wrong-secret", "order.updated", {"id": 1})
+    assert response.status_code == 401
+    assert journaled(config) == {"orders": [], "products": []}
+
+
+def test_variation_is_journaled_as_its_parent_product(config, receiver_url):
+    payload = {"id": 20, "type": "variation", "parent_id": 2}
+    assert send_webhook(receiver_url, SECRET, "product.updated", payload).status_code == 200
+    assert journaled(config)["products"] == [2]
+
+
+def test_pings_and_other_topics_are_not_journaled(config, receiver_url):
+    assert requests.post(receiver_url, data="webhook_id=7").status_code == 200
+    assert send_webhook(receiver_url, SECRET, "coupon.updated", {"id": 1}).status_code == 200
+    assert send_webhook(receiver_url, SECRET, "order.deleted", {"id": 1}).status_code == 200
+    assert journaled(config) == {"orders": [], "products": []}
+
+
+def test_tap_refetches_journaled_ids_after_the_bookmark_sync(config, receiver_url):
+    send_webhook(receiver_url, SECRET, "order.updated", {"id": 1})
+    variation = {"id": 20, "type": "variation", "parent_id": 2}
+    send_webhook(receiver_url, SECRET, "product.updated", variation)
+    bookmark = {"replication_key": "date_modified", "replication_key_value": "2021-02-15T00:00:00"}
+    state = {"bookmarks": {"orders": dict(bookmark), "products": dict(bookmark)}}
+
+    messages = run_tap(config, state)
+
+    # Order 3 is past the bookmark, order 1 and product 2 come from the journal.
+    assert records(messages, "orders") == [3, 1]
+    assert records(messages, "products") == [3, 2]
+    include_requests = [path for path in StoreHandler.requests_seen if "include=" in path]
+    assert len(include_requests) == 2
+    assert journaled(config) == {"orders": [], "products": []}
+    final_state = [message for message in messages if message["type"] == "STATE"][-1]
+    orders_bookmark = final_state["value"]["bookmarks"]["orders"]
+    assert orders_bookmark["replication_key_value"] == "2021-03-01T00:00:00"
+
+
+def test_journal_only_skips_the_date_based_sync(config, receiver_url):
+    config["webhook_journal_only"] = True
+    send_webhook(receiver_url, SECRET, "order.created", {"id": 2})
+
+    messages = run_tap(config)
+
+    assert records(messages, "orders") == [2]
+    assert records(messages, "products") == []
+    assert not any("modified_after=" in path for path in StoreHandler.requests_seen)
+    assert journaled(config) == {"orders": [], "products": []}